@@ -1,6 +1,42 @@
 """Module providing a Reverse Polish Notation (RPN) calculator."""
+import math
 import operator
 import re
+import string
+import sys
+from collections.abc import Callable, Sequence
+from typing import Any
+
+# Operator and parenthesis tokens are interned so hot loops can compare them by identity
+_SYMBOLS = {char: sys.intern(char) for char in "()+-*/"}
+_LPAREN = _SYMBOLS["("]
+_RPAREN = _SYMBOLS[")"]
+_DIGITS = frozenset("0123456789")
+_NAME_START = frozenset(string.ascii_letters + "_")
+_NAME_CHARS = _NAME_START | _DIGITS
+_TOKEN_START = frozenset(_SYMBOLS) | _DIGITS | _NAME_START
+_NUM_RE = re.compile(r"\d+\.?\d*|\.\d+")
+# Small integer literals are common; looking them up skips parsing them with float()
+_SMALL_FLOATS = {str(i): float(i) for i in range(101)}
+# A lone number, or two numbers joined by one operator
+_SIMPLE_RE = re.compile(r"\s*([0-9]+(?:\.[0-9]*)?)\s*(?:([-+*/])\s*([0-9]+(?:\.[0-9]*)?)\s*)?")
+
+
+def _chunk_offset(expression: str, index: int) -> int:
+    """Return where the index-th whitespace-separated chunk of expression starts."""
+    chunks = expression.split()
+    offset = 0
+    for chunk in chunks[:index]:
+        offset = expression.find(chunk, offset) + len(chunk)
+    return expression.find(chunks[index], offset)
+
+
+def _number(value: Any) -> float:
+    """Convert an argument of a compiled function to float, rejecting text."""
+    # float() would also parse strings such as ' 1e3 ' or 'nan', which the grammar rejects
+    if isinstance(value, (str, bytes, bytearray)):
+        raise TypeError(f"Expected a number, got {type(value).__name__}")
+    return float(value)
 
 
 class RPNAPIError(Exception):
@@ -36,36 +72,84 @@ class RPNCalculator:
         "/": 2,
     }
 
-    def __init__(self):
-        pass
-
-    def _tokenize(self, expression: str) -> list:
-        """Tokenize the input expression into numbers, operators, and parentheses."""
-        # Use finditer to get all matches and their positions
-        token_pattern = r"\d+\.?\d*|[()+\-*/]"
-        tokens = []
-        last_end = 0
-        for match in re.finditer(token_pattern, expression):
-            start, end = match.span()
-            # Check for any non-space characters between last_end and start
-            if start > last_end:
-                skipped = expression[last_end:start]
-                if skipped.strip():
-                    raise InvalidTokenError(f"Invalid token: {skipped.strip()}")
-            tokens.append(match.group())
-            last_end = end
-        # Check for any trailing invalid characters after the last match
-        if last_end < len(expression):
-            skipped = expression[last_end:]
-            if skipped.strip():
-                raise InvalidTokenError(f"Invalid token: {skipped.strip()}")
+    def __init__(self, cache_size: int = 1024):
+        self._cache_size = cache_size
+        self._cache: dict[str, tuple] = {}
+        self._functions: dict[tuple, Callable[..., float]] = {}
+
+    def _tokenize(self, expression: str, variables: Sequence[str] = ()) -> list:
+        """Tokenize the input expression into numbers, operators, parentheses, and names.
+
+        Any name not in variables raises InvalidTokenError with its position.
+        """
+        tokens: list[str] = []
+        append = tokens.append
+        # Whitespace only separates tokens, so split it away in C and scan each chunk
+        for index, chunk in enumerate(expression.split()):
+            symbol = _SYMBOLS.get(chunk)
+            if symbol is not None:
+                append(symbol)
+                continue
+            end = self._scan_chunk(chunk, variables, append)
+            if end < len(chunk):
+                raise self._invalid_token(expression, index, chunk, end)
         return tokens
 
+    def _scan_chunk(
+        self, chunk: str, variables: Sequence[str], append: Callable[[str], None]
+    ) -> int:
+        """Append the tokens of a chunk; return where an invalid one starts, or len(chunk)."""
+        i = 0
+        n = len(chunk)
+        while i < n:
+            char = chunk[i]
+            symbol = _SYMBOLS.get(char)
+            if symbol is not None:
+                append(symbol)
+                i += 1
+            elif char in _DIGITS:
+                # Scan a number of the form digits[.digits]
+                j = i + 1
+                while j < n and chunk[j] in _DIGITS:
+                    j += 1
+                if j < n and chunk[j] == ".":
+                    j += 1
+                    while j < n and chunk[j] in _DIGITS:
+                        j += 1
+                append(chunk[i:j])
+                i = j
+            elif char in _NAME_START:
+                j = i + 1
+                while j < n and chunk[j] in _NAME_CHARS:
+                    j += 1
+                if chunk[i:j] not in variables:
+                    return i
+                append(chunk[i:j])
+                i = j
+            else:
+                return i
+        return n
+
+    def _invalid_token(
+        self, expression: str, index: int, chunk: str, start: int
+    ) -> InvalidTokenError:
+        """Build the error for the invalid token at start in the index-th chunk of expression."""
+        end = start + 1
+        if chunk[start] in _NAME_START:
+            while end < len(chunk) and chunk[end] in _NAME_CHARS:
+                end += 1
+        else:
+            # Report the whole run of invalid characters
+            while end < len(chunk) and chunk[end] not in _TOKEN_START:
+                end += 1
+        position = _chunk_offset(expression, index) + start
+        return InvalidTokenError(f"Invalid token at position {position}: {chunk[start:end]}")
+
     def _validate_tokens(self, tokens: list) -> None:
         """Validate that all tokens are numbers, operators, or parentheses."""
         for token in tokens:
             if not (
-                token.replace(".", "", 1).isdigit()
+                _NUM_RE.fullmatch(token)
                 or token in self.OPERATORS
                 or token in ("(", ")")
             ):
@@ -84,73 +168,301 @@ class RPNCalculator:
         if stack:
             raise MismatchedParenthesesError("Mismatched parentheses")
 
-    def infix_to_rpn(self, expression: str) -> list:
-        """Convert infix expression to RPN (postfix) as a list of tokens."""
-        tokens = self._tokenize(expression)
-        self._validate_tokens(tokens)
-        self._check_parentheses(tokens)
+    def _check_result(self, depth: int) -> None:
+        """Check that evaluation leaves exactly one value on the stack."""
+        if depth == 0:
+            raise RPNSyntaxError("No result on the stack (empty expression)")
+        if depth > 1:
+            raise RPNSyntaxError("Malformed expression: too many operands left on the stack")
+
+    def infix_to_rpn(self, expression: str, variables: Sequence[str] = ()) -> list:
+        """Convert infix expression to RPN (postfix) as a list of tokens.
+
+        Numbers are emitted as floats, operators and names in variables as strings.
+        Any other name raises InvalidTokenError.
+        """
+        # Invalid tokens are rejected here, before any parenthesis error can be raised
+        tokens = self._tokenize(expression, variables)
 
-        output = []
-        operators: list[str] = []
+        # Parenthesis balancing happens in this single pass. Both stacks are
+        # preallocated at the token count, which bounds their size, and
+        # addressed through write cursors.
+        output: list = [None] * len(tokens)
+        operators: list = [None] * len(tokens)
+        oi = 0
+        si = 0
+        priority = self.PRIORITY
+        small_float = _SMALL_FLOATS.get
 
         for token in tokens:
-            if token.replace(".", "", 1).isdigit():
-                output.append(token)
-            elif token in self.OPERATORS:
+            if token[0].isdigit():
+                value = small_float(token)
+                output[oi] = float(token) if value is None else value
+                oi += 1
+            elif token in priority:
+                prec = priority[token]
                 while (
-                    operators
-                    and operators[-1] != "("
-                    and self.PRIORITY[operators[-1]] >= self.PRIORITY[token]
+                    si
+                    and operators[si - 1] is not _LPAREN
+                    and priority[operators[si - 1]] >= prec
                 ):
-                    output.append(operators.pop())
-                operators.append(token)
-            elif token == "(":
-                operators.append(token)
-            elif token == ")":
-                while operators and operators[-1] != "(":
-                    output.append(operators.pop())
-                if not operators:
+                    si -= 1
+                    output[oi] = operators[si]
+                    oi += 1
+                operators[si] = token
+                si += 1
+            elif token is _LPAREN:
+                operators[si] = token
+                si += 1
+            elif token is _RPAREN:
+                while si and operators[si - 1] is not _LPAREN:
+                    si -= 1
+                    output[oi] = operators[si]
+                    oi += 1
+                if not si:
                     raise MismatchedParenthesesError("Mismatched parentheses")
-                operators.pop()
+                si -= 1
+            else:
+                # The tokenizer only lets through names in variables
+                output[oi] = token
+                oi += 1
 
-        while operators:
-            if operators[-1] in ("(", ")"):
-                raise MismatchedParenthesesError("Mismatched parentheses")
-            output.append(operators.pop())
+        # Operators left on the stack are emitted top first
+        pending = operators[:si]
+        if _LPAREN in pending:
+            raise MismatchedParenthesesError("Mismatched parentheses")
+        pending.reverse()
+        output[oi:oi + si] = pending
 
+        del output[oi + si:]
         return output
 
-    def evaluate_rpn(self, tokens: list) -> float:
-        """Evaluate an RPN (postfix) expression given as a list of tokens."""
-        stack = []
+    def evaluate_rpn(self, tokens: list | tuple) -> float:
+        """Evaluate an RPN (postfix) expression given as a list of tokens.
+
+        Numbers may be given as floats or as numeric strings.
+        """
+        # The stack never holds more values than there are tokens
+        stack = [0.0] * len(tokens)
+        sp = 0
+        operators = self.OPERATORS
 
         for token in tokens:
-            if token.replace(".", "", 1).isdigit():
-                stack.append(float(token))
-            elif token in self.OPERATORS:
-                if len(stack) < 2:
+            if isinstance(token, float):
+                stack[sp] = token
+                sp += 1
+                continue
+            func = operators.get(token)
+            if func is not None:
+                if sp < 2:
                     raise RPNSyntaxError("Not enough operands for operator")
-                b = stack.pop()
-                a = stack.pop()
+                sp -= 1
                 try:
-                    res = self.OPERATORS[token](a, b)
+                    stack[sp - 1] = func(stack[sp - 1], stack[sp])
                 except ZeroDivisionError as exc:
                     raise RPNSyntaxError("Division by zero") from exc
-                stack.append(res)
+            elif _NUM_RE.fullmatch(token):
+                value = _SMALL_FLOATS.get(token)
+                stack[sp] = float(token) if value is None else value
+                sp += 1
             else:
                 raise InvalidTokenError(f"Invalid token in RPN: {token}")
 
-        if len(stack) == 0:
-            raise RPNSyntaxError("No result on the stack (empty expression)")
-        if len(stack) > 1:
-            raise RPNSyntaxError("Malformed expression: too many operands left on the stack")
+        self._check_result(sp)
 
         return stack[0]
 
+    def _link(self, rpn_tokens: list, var_names: Sequence[str] = ()) -> tuple:
+        """Turn RPN tokens into a program of floats and operator functions.
+
+        The operand count is checked here, so running the program needs no stack checks.
+        Variables become the int index of their first occurrence in var_names, a slot
+        that must be replaced by its value before the program is run.
+        """
+        operators = self.OPERATORS
+        program: list = []
+        depth = 0
+        for token in rpn_tokens:
+            if isinstance(token, float):
+                program.append(token)
+                depth += 1
+            elif token in operators:
+                if depth < 2:
+                    raise RPNSyntaxError("Not enough operands for operator")
+                program.append(operators[token])
+                depth -= 1
+            else:
+                program.append(var_names.index(token))
+                depth += 1
+
+        self._check_result(depth)
+
+        return tuple(program)
+
+    def _run(self, program: tuple) -> float:
+        """Execute a program built by _link."""
+        stack = [0.0] * len(program)
+        sp = 0
+        for token in program:
+            if isinstance(token, float):
+                stack[sp] = token
+                sp += 1
+            else:
+                # Combine the top two values in place
+                sp -= 1
+                try:
+                    stack[sp - 1] = token(stack[sp - 1], stack[sp])
+                except ZeroDivisionError as exc:
+                    raise RPNSyntaxError("Division by zero") from exc
+        return stack[0]
+
+    def _remember(self, cache: dict, key, value) -> None:
+        """Store value in cache unless caching is disabled, evicting the least recently used entry.
+
+        Callers pop an entry on a hit and store it again, which moves it to the end,
+        so the first entry is always the least recently used one.
+        """
+        if self._cache_size > 0:
+            if len(cache) >= self._cache_size:
+                # Another thread may have evicted the same entry already
+                cache.pop(next(iter(cache)), None)
+            cache[key] = value
+
+    def _simple_program(self, expression: str) -> tuple | None:
+        """Build the program for a lone number or 'a op b' directly; None for anything else."""
+        match = _SIMPLE_RE.fullmatch(expression)
+        if match is None:
+            return None
+        a, op, b = match.groups()
+        if op is None:
+            return (float(a),)
+        return (float(a), float(b), self.OPERATORS[op])
+
+    def _compile(self, expression: str) -> tuple:
+        """Return the program for an expression, caching it by expression string."""
+        program = self._cache.pop(expression, None)
+        if program is None:
+            program = self._simple_program(expression)
+            if program is None:
+                program = self._link(self.infix_to_rpn(expression))
+        self._remember(self._cache, expression, program)
+        return program
+
+    def _to_source(self, rpn_tokens: list, arg_of: dict[str, str]) -> str:
+        """Rebuild RPN tokens as infix Python source, with variables renamed by arg_of.
+
+        Parentheses are added only where precedence or evaluation order requires them.
+        """
+        priority = self.PRIORITY
+        stack: list[tuple[str, int]] = []
+        for token in rpn_tokens:
+            if isinstance(token, float):
+                stack.append((repr(token) if math.isfinite(token) else "_INF", 3))
+            elif token in priority:
+                if len(stack) < 2:
+                    raise RPNSyntaxError("Not enough operands for operator")
+                prec = priority[token]
+                right, right_prec = stack.pop()
+                left, left_prec = stack.pop()
+                if left_prec < prec:
+                    left = f"({left})"
+                if right_prec <= prec:
+                    right = f"({right})"
+                stack.append((f"{left} {token} {right}", prec))
+            else:
+                stack.append((arg_of[token], 3))
+
+        self._check_result(len(stack))
+        return stack[0][0]
+
+    def _generate(self, rpn_tokens: list, var_names: tuple) -> Callable[..., float]:
+        """Generate a Python function computing RPN tokens over positional variables."""
+        args = [f"v{i}" for i in range(len(var_names))]
+        arg_of: dict[str, str] = {}
+        for name, arg in zip(var_names, args):
+            arg_of.setdefault(name, arg)
+
+        # Coerce the arguments so results are floats, as from evaluate
+        coercions = "".join(f"    {arg} = _number({arg})\n" for arg in args)
+        source = (
+            f"def _rpn_function({', '.join(args)}):\n"
+            f"{coercions}"
+            f"    try:\n"
+            f"        return {self._to_source(rpn_tokens, arg_of)}\n"
+            f"    except ZeroDivisionError:\n"
+            f"        raise RPNSyntaxError('Division by zero') from None\n"
+        )
+        namespace: dict[str, Any] = {
+            "RPNSyntaxError": RPNSyntaxError, "_INF": math.inf, "_number": _number,
+        }
+        try:
+            # The source is built only from float reprs, operators and argument names
+            exec(source, namespace)  # pylint: disable=exec-used
+        except (SyntaxError, RecursionError, MemoryError):
+            # Too long or too deeply nested for Python's compiler
+            return self._interpret(rpn_tokens, var_names)
+        return namespace["_rpn_function"]
+
+    def _interpret(self, rpn_tokens: list, var_names: tuple) -> Callable[..., float]:
+        """Build a function that fills the variable slots of a linked program and runs it."""
+        program = self._link(rpn_tokens, var_names)
+        arity = len(var_names)
+        run = self._run
+
+        def _rpn_function(*args: Any) -> float:
+            if len(args) != arity:
+                raise TypeError(f"Expected {arity} arguments, got {len(args)}")
+            values = [_number(arg) for arg in args]
+            # Slots are the only ints in the program
+            filled = [values[token] if isinstance(token, int) else token for token in program]
+            return run(tuple(filled))
+
+        return _rpn_function
+
+    def compile(self, expression: str, var_names: Sequence[str] = ()) -> Callable[..., float]:
+        """Compile an expression over named variables into a Python function.
+
+        The function takes the variable values positionally, in var_names order,
+        and raises TypeError for strings instead of parsing them. Expressions too
+        large for Python's compiler are run by an interpreted function instead.
+        Compiled functions are cached by expression and var_names.
+        """
+        key = (expression, tuple(var_names))
+        func = self._functions.pop(key, None)
+        if func is None:
+            func = self._generate(self.infix_to_rpn(expression, key[1]), key[1])
+        self._remember(self._functions, key, func)
+        return func
+
+    def evaluate_batch(self, expression: str, /, **inputs: Sequence[float]) -> list[float]:
+        """Evaluate an expression for each row of equally long input sequences.
+
+        Each keyword argument supplies the values of the variable it names, and
+        the rows come from these inputs. The expression is compiled once.
+        Every value must be a number: whole arrays, such as NumPy arrays, are
+        not evaluated elementwise but rejected by the compiled function.
+        ValueError is raised if no inputs are given or their lengths differ.
+        """
+        if not inputs:
+            raise ValueError("evaluate_batch needs at least one input sequence")
+        func = self.compile(expression, tuple(inputs))
+        return [func(*row) for row in zip(*inputs.values(), strict=True)]
+
     def evaluate(self, expression: str) -> float:
-        """Evaluate an infix expression and return the result."""
-        rpn_tokens = self.infix_to_rpn(expression)
-        return self.evaluate_rpn(rpn_tokens)
+        """Evaluate an infix expression and return the result.
+
+        The expression is compiled to a program of floats and operator functions,
+        which is cached unless caching is disabled, and then run.
+        """
+        return self._run(self._compile(expression))
+
+
+def format_rpn(tokens: list) -> str:
+    """Format RPN tokens for display, writing integral numbers without '.0'."""
+    return " ".join(
+        str(int(token)) if isinstance(token, float) and token.is_integer() else str(token)
+        for token in tokens
+    )
 
 
 if __name__ == "__main__":
@@ -167,7 +479,7 @@ if __name__ == "__main__":
 
             rpn_token_list = calc.infix_to_rpn(expr)
             result_val = calc.evaluate_rpn(rpn_token_list)
-            print(f"RPN: {' '.join(map(str, rpn_token_list))}")
+            print(f"RPN: {format_rpn(rpn_token_list)}")
             print(f"Result: {result_val}")
         except RPNAPIError as e:
             print(f"Error: {e}")
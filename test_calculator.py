@@ -1,33 +1,42 @@
 """Unit tests for the RPNCalculator module."""
 import unittest
-from calculator import RPNCalculator, InvalidTokenError, MismatchedParenthesesError, RPNSyntaxError
+from calculator import (
+    RPNCalculator, RPNAPIError, InvalidTokenError, MismatchedParenthesesError, RPNSyntaxError,
+    format_rpn,
+)
 
 
 class TestRPNCalculator(unittest.TestCase):
     """Unit tests for the RPNCalculator class."""
 
     def setUp(self):
-        """Set up a new RPNCalculator instance for each test."""
+        """Set up new RPNCalculator instances, with and without caching, for each test."""
         self.calc = RPNCalculator()
+        self.uncached = RPNCalculator(cache_size=0)
 
     def test_infix_to_rpn(self):
         """Test conversion from infix to RPN (postfix) notation."""
         test_cases = [
-            ("3 + 4", ['3', '4', '+']),
-            ("3 + 4 * 2", ['3', '4', '2', '*', '+']),
-            ("(3 + 4) * 2", ['3', '4', '+', '2', '*']),
-            ("3 + 4 * 2 / (1 - 5)", ['3', '4',
-             '2', '*', '1', '5', '-', '/', '+']),
-            ("2 + 3 * 4 - 5", ['2', '3', '4', '*', '+', '5', '-']),
-            ("(1 + 2) * (3 + 4)", ['1', '2', '+', '3', '4', '+', '*']),
-            ("10 - (2 + 3) * 4", ['10', '2', '3', '+', '4', '*', '-']),
-            ("2.5 + 3.7 * 4", ['2.5', '3.7', '4', '*', '+']),
+            ("3 + 4", [3.0, 4.0, '+']),
+            ("3 + 4 * 2", [3.0, 4.0, 2.0, '*', '+']),
+            ("(3 + 4) * 2", [3.0, 4.0, '+', 2.0, '*']),
+            ("3 + 4 * 2 / (1 - 5)", [3.0, 4.0,
+             2.0, '*', 1.0, 5.0, '-', '/', '+']),
+            ("2 + 3 * 4 - 5", [2.0, 3.0, 4.0, '*', '+', 5.0, '-']),
+            ("(1 + 2) * (3 + 4)", [1.0, 2.0, '+', 3.0, 4.0, '+', '*']),
+            ("10 - (2 + 3) * 4", [10.0, 2.0, 3.0, '+', 4.0, '*', '-']),
+            ("2.5 + 3.7 * 4", [2.5, 3.7, 4.0, '*', '+']),
         ]
 
         for expr, expected in test_cases:
             with self.subTest(expr=expr):
                 self.assertEqual(self.calc.infix_to_rpn(expr), expected)
 
+    def test_format_rpn(self):
+        """Test display formatting of RPN token lists."""
+        self.assertEqual(format_rpn(self.calc.infix_to_rpn("10 - 2.5 * 4")), "10 2.5 4 * -")
+        self.assertEqual(format_rpn(['3', '4', '+']), "3 4 +")
+
     def test_evaluate_rpn(self):
         """Test evaluation of RPN (postfix) expressions."""
         test_cases = [
@@ -35,6 +44,7 @@ class TestRPNCalculator(unittest.TestCase):
             (['3', '4', '2', '*', '+'], 11),
             (['3', '4', '+', '2', '*'], 14),
             (['3', '4', '2', '*', '1', '5', '-', '/', '+'], 1),
+            ([3.0, 4.0, '+', 2.0, '*'], 14),
         ]
 
         for rpn, expected in test_cases:
@@ -50,41 +60,195 @@ class TestRPNCalculator(unittest.TestCase):
             ("3 + 4 * 2 / (1 - 5)", 1),
             ("10 / 2", 5),
             ("2.5 * 3", 7.5),
+            ("10 - 4 - 3", 3),
+            ("16 / 4 / 2", 2),
+            ("((2))", 2),
+            ("42", 42),
+            (" 2.5 ", 2.5),
+            ("7 - 10", -3),
+            ("3. * 2", 6),
         ]
 
-        for expr, expected in test_cases:
+        for calc in (self.calc, self.uncached):
+            for expr, expected in test_cases:
+                with self.subTest(expr=expr, cached=calc is self.calc):
+                    self.assertAlmostEqual(calc.evaluate(expr), expected)
+
+    def test_evaluate_deeply_nested(self):
+        """Test that deep parenthesis nesting does not hit the recursion limit."""
+        expr = "(" * 5000 + "1 + 2" + ")" * 5000
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                self.assertAlmostEqual(calc.evaluate(expr), 3)
+
+    def test_evaluate_cached(self):
+        """Test that repeated and evicted expressions evaluate consistently."""
+        calc = RPNCalculator(cache_size=2)
+        for _ in range(2):
+            for expr, expected in (("1 + 2", 3), ("2 * 3", 6), ("(1 + 2) * 3", 9)):
+                with self.subTest(expr=expr):
+                    self.assertAlmostEqual(calc.evaluate(expr), expected)
+        with self.assertRaises(RPNSyntaxError):
+            calc.evaluate("3 / 0")
+        with self.assertRaises(RPNSyntaxError):
+            calc.evaluate("3 / 0")
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test that a cache hit keeps an expression from being evicted next."""
+        calc = RPNCalculator(cache_size=2)
+        for expr in ("1 + 2", "2 * 3", "1 + 2", "(1 + 2) * 3"):
+            calc.evaluate(expr)
+        self.assertEqual(list(calc._cache), ["1 + 2", "(1 + 2) * 3"])  # pylint: disable=protected-access
+
+    def test_compile(self):
+        """Test compiling expressions over variables into functions."""
+        func = self.calc.compile("x * (y + 2) - 3 / x", ["x", "y"])
+        self.assertAlmostEqual(func(2, 4), 10.5)
+        self.assertAlmostEqual(func(3, 0), 5)
+        self.assertIs(self.calc.compile("x * (y + 2) - 3 / x", ("x", "y")), func)
+        with self.assertRaises(RPNSyntaxError):
+            func(0, 1)
+
+        for expr in ("10 - (4 - 3)", "(2 + 3) * 4", "16 / (4 / 2)", "1 - 2 * 3 + 4", "((7))"):
             with self.subTest(expr=expr):
-                self.assertAlmostEqual(self.calc.evaluate(expr), expected)
+                self.assertAlmostEqual(self.calc.compile(expr)(), self.calc.evaluate(expr))
+
+        for result, expected in (
+            (self.calc.compile("x", ["x"])(5), 5.0),
+            (self.calc.compile("x * y", ["x", "y"])(2 ** 70, 3), float(2 ** 70) * 3.0),
+        ):
+            self.assertIs(type(result), float)
+            self.assertEqual(result, expected)
+
+        for expr in ("1 - (" * 500 + "x" + ")" * 500, " + ".join(["x"] * 3000), "x / (x - x)"):
+            with self.subTest(expr=expr[:20]):
+                func = self.calc.compile(expr, ["x"])
+                for value in (3, 2.5):
+                    try:
+                        expected = self.calc.evaluate(expr.replace("x", str(value)))
+                    except RPNSyntaxError:
+                        with self.assertRaises(RPNSyntaxError):
+                            func(value)
+                    else:
+                        self.assertEqual(func(value), expected)
+                for value in (" 1e3 ", "nan", b"1"):
+                    with self.assertRaises(TypeError):
+                        func(value)
+                with self.assertRaises(TypeError):
+                    func()
 
-    def test_invalid_tokens(self):
-        """Test that invalid tokens raise InvalidTokenError."""
-        with self.assertRaises(InvalidTokenError):
-            self.calc.evaluate("3 + 4a")
-        with self.assertRaises(InvalidTokenError):
-            self.calc.evaluate("foo * 2")
         with self.assertRaises(InvalidTokenError):
-            self.calc.evaluate("2 $ 3")
+            self.calc.compile("x + z", ["x"])
+        with self.assertRaises(RPNSyntaxError):
+            self.calc.compile("x +", ["x"])
+
+    def test_evaluate_batch(self):
+        """Test evaluating one expression over rows of variable values."""
+        xs = [1, 2.5, 4]
+        ys = [0, 1, 2]
+        results = self.calc.evaluate_batch("x * (y + 2) - 3 / x", x=xs, y=ys)
+        for result, x, y in zip(results, xs, ys):
+            self.assertAlmostEqual(result, x * (y + 2) - 3 / x)
+
+        self.assertEqual(self.calc.evaluate_batch("x + y", x=[1, 2], y=[3, 4]), [4.0, 6.0])
+        for result in self.calc.evaluate_batch("x + y", x=[1, 2], y=[3, 4]):
+            self.assertIs(type(result), float)
+        # Variables may share a name with evaluate_batch's own parameters
+        results = self.calc.evaluate_batch(  # pylint: disable=kwarg-superseded-by-positional-arg
+            "expression + self", expression=[1], self=[2]
+        )
+        self.assertEqual(results, [3.0])
+
+        with self.assertRaises(ValueError):
+            self.calc.evaluate_batch("x + y", x=[1, 2], y=[1])
+        with self.assertRaises(ValueError):
+            self.calc.evaluate_batch("1 + 2")
         with self.assertRaises(InvalidTokenError):
-            self.calc.evaluate("5 @ 1")
+            self.calc.evaluate_batch("x + y", x=[1, 2])
+
+    def test_cached_and_uncached_errors_agree(self):
+        """Test that inputs with several problems raise the same error with and without caching."""
+        exprs = [
+            "(3 / 0", "3 / 0 )", "*9230+a3", "+ 3 a", "3 + 4) * a",
+            "3 / 0 +", "3 4 / 0", "1 / 0 / 0 2", ") 3 / 0",
+        ]
+        for expr in exprs:
+            with self.subTest(expr=expr):
+                with self.assertRaises(RPNAPIError) as cached:
+                    self.calc.evaluate(expr)
+                with self.assertRaises(RPNAPIError) as uncached:
+                    self.uncached.evaluate(expr)
+                self.assertIs(type(uncached.exception), type(cached.exception))
+                self.assertEqual(str(uncached.exception), str(cached.exception))
+
+    def test_invalid_tokens(self):
+        """Test that invalid tokens raise InvalidTokenError."""
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                with self.assertRaises(InvalidTokenError):
+                    calc.evaluate("3 + 4a")
+                with self.assertRaises(InvalidTokenError):
+                    calc.evaluate("foo * 2")
+                with self.assertRaises(InvalidTokenError):
+                    calc.evaluate("2 $ 3")
+                with self.assertRaises(InvalidTokenError):
+                    calc.evaluate("5 @ 1")
+        with self.assertRaisesRegex(InvalidTokenError, "position 5: \\$#"):
+            self.calc.evaluate("2 + 3$# * 2")
+        with self.assertRaisesRegex(InvalidTokenError, "position 2: \\$"):
+            self.calc.evaluate("2 $ foo")
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                with self.assertRaisesRegex(InvalidTokenError, "position 5: a$"):
+                    calc.evaluate("3 + 4a")
+                with self.assertRaisesRegex(InvalidTokenError, "position 0: foo$"):
+                    calc.evaluate("foo * 2")
+        with self.assertRaisesRegex(InvalidTokenError, "position 4: z$"):
+            self.calc.compile("x + z", ["x"])
+
+    def test_validate_tokens(self):
+        """Test that _validate_tokens rejects anything but numbers, operators and parentheses."""
+        self.calc._validate_tokens(['3', '.5', '2.', '+', '(', ')'])  # pylint: disable=protected-access
+        for token in ('1a', '1.2.3', '', 'x'):
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidTokenError):
+                    self.calc._validate_tokens([token])  # pylint: disable=protected-access
 
     def test_mismatched_parentheses(self):
         """Test that mismatched parentheses raise MismatchedParenthesesError."""
-        with self.assertRaises(MismatchedParenthesesError):
-            self.calc.evaluate("(3 + 4")
-        with self.assertRaises(MismatchedParenthesesError):
-            self.calc.evaluate("3 + 4)")
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                with self.assertRaises(MismatchedParenthesesError):
+                    calc.evaluate("(3 + 4")
+                with self.assertRaises(MismatchedParenthesesError):
+                    calc.evaluate("3 + 4)")
+
+    def test_invalid_token_beats_mismatched_parentheses(self):
+        """Test that an invalid token is reported even after an unmatched parenthesis."""
+        for expr in ("3 + 4) * a", "(3 + a", ") a"):
+            with self.subTest(expr=expr):
+                with self.assertRaises(InvalidTokenError):
+                    self.calc.infix_to_rpn(expr)
 
     def test_syntax_errors(self):
         """Test that syntax errors raise RPNSyntaxError."""
-        with self.assertRaises(RPNSyntaxError):
-            self.calc.evaluate("3 +")
-        with self.assertRaises(RPNSyntaxError):
-            self.calc.evaluate("+ 3")
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                with self.assertRaises(RPNSyntaxError):
+                    calc.evaluate("3 +")
+                with self.assertRaises(RPNSyntaxError):
+                    calc.evaluate("+ 3")
+                with self.assertRaises(RPNSyntaxError):
+                    calc.evaluate("3 4")
+                with self.assertRaises(RPNSyntaxError):
+                    calc.evaluate("")
 
     def test_division_by_zero(self):
         """Test that division by zero raises RPNSyntaxError."""
-        with self.assertRaises(RPNSyntaxError):
-            self.calc.evaluate("3 / 0")
+        for calc in (self.calc, self.uncached):
+            with self.subTest(cached=calc is self.calc):
+                with self.assertRaises(RPNSyntaxError):
+                    calc.evaluate("3 / 0")
 
 
 if __name__ == '__main__':